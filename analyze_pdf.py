@@ -3,57 +3,132 @@ PDF Analysis Script
 Extracts and analyzes content from the PDF file
 """
 
+import hashlib
+import json
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
 import pdfplumber
 import pandas as pd
 import re
 
 pdf_path = "robertsonjoshua_LATE_5890806_link (1).pdf"
+text_file = "pdf_extracted_text.txt"
 
-print("="*80)
-print("PDF Analysis")
-print("="*80)
-print(f"\nAnalyzing: {pdf_path}\n")
+# Pages drawn with more curves than this are treated as charts/diagrams
+MAX_TABLE_CURVES = 2000
 
-with pdfplumber.open(pdf_path) as pdf:
-    print(f"Total pages: {len(pdf.pages)}")
-    print("\n" + "="*80)
+# Bump when extraction or table-skip rules change so older caches are not reused
+CACHE_VERSION = 1
 
-    # Extract all text
-    full_text = ""
-    for i, page in enumerate(pdf.pages, 1):
-        text = page.extract_text()
-        full_text += text + "\n\n"
-        print(f"\n--- PAGE {i} ---\n")
-        print(text)
-        print("\n")
 
-    # Try to extract tables
-    print("\n" + "="*80)
-    print("EXTRACTING TABLES")
+def table_skip_reason(page):
+    """
+    Return why table detection can be skipped on a page, or None to run it
+    """
+    # extract_tables() walks every path on the page, which dominates on chart pages
+    if len(page.curves) > MAX_TABLE_CURVES:
+        return f"graphics-heavy ({len(page.curves)} curves)"
+    # The default "lines" strategy builds cells only from ruling edges (lines, rect
+    # and curve sides), so a page without any can never yield a table
+    if not page.edges:
+        return "no ruling edges"
+    return None
+
+
+def extract_page(args):
+    """
+    Extract text and tables from a single page (runs in a worker process)
+    """
+    path, i = args
+    # Opening with pages=[i] keeps each worker's parsed objects to one page
+    with pdfplumber.open(path, pages=[i]) as pdf:
+        page = pdf.pages[0]
+        skip_reason = table_skip_reason(page)
+        tables = [] if skip_reason else page.extract_tables()
+        return i, page.extract_text(), tables, skip_reason
+
+
+def main():
+    # Extractions are cached by content hash so an unchanged PDF is never re-parsed;
+    # the extraction settings are part of the key so changing them invalidates the cache
+    pdf_hash = hashlib.md5(Path(pdf_path).read_bytes()).hexdigest()
+    settings = json.dumps({"version": CACHE_VERSION, "max_table_curves": MAX_TABLE_CURVES},
+                          sort_keys=True)
+    settings_hash = hashlib.md5(settings.encode("utf-8")).hexdigest()[:8]
+    cache_dir = Path(".pdfcache") / f"{pdf_hash}-{settings_hash}"
+    cached_text = cache_dir / "text.txt"
+    manifest_file = cache_dir / "manifest.json"
+
+    print("="*80)
+    print("PDF Analysis")
     print("="*80)
+    print(f"\nAnalyzing: {pdf_path}\n")
 
+    if cached_text.exists() and manifest_file.exists():
+        manifest = json.loads(manifest_file.read_text(encoding="utf-8"))
+        print(f"PDF unchanged - using cached extraction from {cache_dir}")
+
+        shutil.copyfile(cached_text, text_file)
+        for name in manifest["tables"]:
+            shutil.copyfile(cache_dir / name, name)
+
+        print("\n" + "="*80)
+        print(f"✓ Text restored to: {text_file}")
+        for i, name in enumerate(manifest["tables"], 1):
+            print(f"✓ Table {i} restored to: {name}")
+        print("="*80)
+        return
+
+    with pdfplumber.open(pdf_path) as pdf:
+        n_pages = len(pdf.pages)
+    print(f"Total pages: {n_pages}")
+    print("\n" + "="*80)
+
+    # Parsing is CPU-bound, so pages are fanned out across processes; map() yields
+    # results in page order and each page's text is written out as it arrives
     all_tables = []
-    for i, page in enumerate(pdf.pages, 1):
-        tables = page.extract_tables()
-        if tables:
-            print(f"\nFound {len(tables)} table(s) on page {i}")
-            for j, table in enumerate(tables, 1):
-                print(f"\nTable {j} on page {i}:")
-                df = pd.DataFrame(table[1:], columns=table[0] if table else None)
-                print(df)
-                all_tables.append(df)
-
-    # Save extracted content
-    with open("pdf_extracted_text.txt", "w", encoding="utf-8") as f:
-        f.write(full_text)
+    with ProcessPoolExecutor() as executor, open(text_file, "w", encoding="utf-8") as out:
+        results = executor.map(extract_page, [(pdf_path, i) for i in range(1, n_pages + 1)])
+        for i, text, tables, skip_reason in results:
+            out.write(text)
+            out.write("\n\n")
+            print(f"\n--- PAGE {i} ---\n")
+            print(text)
+            print("\n")
+
+            if skip_reason:
+                print(f"Skipped table detection on page {i}: {skip_reason}")
+            elif tables:
+                print(f"\nFound {len(tables)} table(s) on page {i}")
+                for j, table in enumerate(tables, 1):
+                    print(f"\nTable {j} on page {i}:")
+                    df = pd.DataFrame(table[1:], columns=table[0] if table else None)
+                    print(df)
+                    all_tables.append(df)
 
     print("\n" + "="*80)
-    print("✓ Text saved to: pdf_extracted_text.txt")
+    print(f"✓ Text saved to: {text_file}")
 
+    table_files = []
     if all_tables:
         for i, df in enumerate(all_tables):
             filename = f"pdf_table_{i+1}.csv"
             df.to_csv(filename, index=False)
+            table_files.append(filename)
             print(f"✓ Table {i+1} saved to: {filename}")
 
     print("="*80)
+
+    # Cache the extraction; the manifest is written last so a partial cache is never used
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(text_file, cached_text)
+    for name in table_files:
+        shutil.copyfile(name, cache_dir / name)
+    manifest_file.write_text(json.dumps({"pdf": pdf_path, "tables": table_files}, indent=2),
+                             encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
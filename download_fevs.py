@@ -4,9 +4,25 @@ This script attempts to download the FEVS 2024 Public Data File from OPM
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+import functools
 import os
 from pathlib import Path
 
+@functools.lru_cache(maxsize=1)
+def _session():
+    """
+    Shared session, so repeated downloads reuse pooled OPM connections
+    """
+    session = requests.Session()
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    })
+    # Every candidate lives on www.opm.gov; size the pool for the concurrent probes
+    session.mount("https://www.opm.gov", HTTPAdapter(pool_connections=2, pool_maxsize=8))
+    return session
+
 def download_fevs_interactive():
     """
     Download FEVS data with proper form handling
@@ -21,10 +37,7 @@ def download_fevs_interactive():
 
     print("\nAttempting to access OPM FEVS data portal...")
 
-    session = requests.Session()
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    })
+    session = _session()
 
     # Try direct download patterns for 2024
     possible_urls = [
@@ -47,37 +60,72 @@ def download_fevs_interactive():
 
     print(f"\nTrying {len(possible_urls)} possible download URLs...\n")
 
-    for i, url in enumerate(possible_urls, 1):
+    # Probe with HEAD first so missing files and error pages never download a body.
+    # Only 404/410 rule a URL out; servers that reject HEAD itself (403, 405,
+    # 501, ...) while serving GET normally still get the full GET. All probes
+    # run at once, but results are checked in list order to keep the 2024 files
+    # ahead of the 2023 fallback.
+    executor = ThreadPoolExecutor(max_workers=len(possible_urls))
+    probes = [executor.submit(session.head, url, timeout=10, allow_redirects=True)
+              for url in possible_urls]
+    executor.shutdown(wait=False)
+
+    for i, (url, probe) in enumerate(zip(possible_urls, probes), 1):
         print(f"[{i}/{len(possible_urls)}] Testing: {url}")
         try:
-            response = session.get(url, timeout=30, allow_redirects=True)
+            head = probe.result()
+            if head.status_code in (404, 410):
+                print(f"  × HTTP {head.status_code}")
+                continue
+
+            head_length = int(head.headers.get('Content-Length', 0))
+            if head.status_code == 200 and 0 < head_length <= 10000:
+                print(f"  × Response too small ({head_length} bytes) - likely error page")
+                continue
+
+            with session.get(url, timeout=30, allow_redirects=True, stream=True) as response:
+                if response.status_code == 200:
+                    # Check if we got actual data (not an error page) before reading the body
+                    content_type = response.headers.get('content-type', '').lower()
+                    expected_length = int(response.headers.get('Content-Length', 0))
+
+                    if 0 < expected_length <= 10000:
+                        print(f"  × Response too small ({expected_length} bytes) - likely error page")
+                        continue
 
-            if response.status_code == 200:
-                # Check if we got actual data (not an error page)
-                content_type = response.headers.get('content-type', '').lower()
-                content_length = len(response.content)
-
-                if content_length > 10000:  # At least 10KB
                     # Determine file extension
                     if 'excel' in content_type or url.endswith('.xlsx'):
                         filename = "2024_FEVS_Prdf.xlsx"
                     else:
                         filename = "2024_FEVS_Prdf.csv"
 
-                    # Save the file
-                    with open(filename, 'wb') as f:
-                        f.write(response.content)
-
-                    print(f"\n✓ SUCCESS!")
-                    print(f"  Downloaded: {filename}")
-                    print(f"  Size: {content_length:,} bytes ({content_length/1024/1024:.2f} MB)")
-                    print(f"  Content-Type: {content_type}")
-                    print(f"\n  File saved to: {os.path.abspath(filename)}")
-                    return filename
+                    # Stream to a .part file so only one chunk is held in memory and an
+                    # existing data file is only replaced by a complete, large-enough download
+                    part_file = filename + ".part"
+                    content_length = 0
+                    try:
+                        with open(part_file, 'wb') as f:
+                            for chunk in response.iter_content(chunk_size=1 << 20):
+                                f.write(chunk)
+                                content_length += len(chunk)
+
+                        if content_length > 10000:  # At least 10KB
+                            os.replace(part_file, filename)
+                    finally:
+                        if os.path.exists(part_file):
+                            os.remove(part_file)
+
+                    if content_length > 10000:
+                        print(f"\n✓ SUCCESS!")
+                        print(f"  Downloaded: {filename}")
+                        print(f"  Size: {content_length:,} bytes ({content_length/1024/1024:.2f} MB)")
+                        print(f"  Content-Type: {content_type}")
+                        print(f"\n  File saved to: {os.path.abspath(filename)}")
+                        return filename
+                    else:
+                        print(f"  × Response too small ({content_length} bytes) - likely error page")
                 else:
-                    print(f"  × Response too small ({content_length} bytes) - likely error page")
-            else:
-                print(f"  × HTTP {response.status_code}")
+                    print(f"  × HTTP {response.status_code}")
 
         except Exception as e:
             print(f"  × Error: {e}")
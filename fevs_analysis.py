@@ -6,18 +6,32 @@ Analyzes Federal Employee Viewpoint Survey data to answer:
 3. What patterns exist across groups?
 """
 
+import os
 import pandas as pd
 import numpy as np
+import matplotlib
+# Render off-screen unless FEVS_SHOW is set, so headless runs never load a GUI toolkit
+show_plots = bool(os.environ.get('FEVS_SHOW'))
+if not show_plots:
+    matplotlib.use('Agg')
 import matplotlib.pyplot as plt
-import seaborn as sns
+import sys
 import requests
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:  # Fall back to the pandas C parser
+    pa = None
 from io import BytesIO
 import warnings
 warnings.filterwarnings('ignore')
 
-# Set visualization style
-sns.set_style("whitegrid")
-plt.rcParams['figure.figsize'] = (14, 8)
+# Set visualization style (skipped entirely with --no-plot)
+no_plot = '--no-plot' in sys.argv
+if not no_plot:
+    import seaborn as sns
+    sns.set_style("whitegrid")
+    plt.rcParams['figure.figsize'] = (14, 8)
 
 print("="*80)
 print("FEVS 2024 Employee Engagement Analysis")
@@ -31,9 +45,77 @@ print("Source: https://www.opm.gov/fevs/reports/data-files/2024/")
 # or update the file path below
 fevs_file = "2024_FEVS_Prdf.csv"  # Update this path if needed
 
+# Engagement variables (X - low engagement indicators), defined up front so only
+# the columns the analysis uses are read from the CSV
+engagement_vars = {
+    'Q40': 'Opportunity to improve skills',
+    'Q12': 'Know what is expected of me',
+    'Q42': 'Supervisor supports work-life balance',
+    'Q69': 'Overall job satisfaction',
+    'Q11': 'Encouraged to come up with new ideas',
+    'Q13': 'Physical conditions allow good performance',
+    'Q14': 'Training needs are assessed',
+    'Q15': 'Satisfied with training received',
+}
+
+# Turnover intent variable (related to Y - voluntary turnover)
+turnover_var = 'DLEAVING'  # "Considering leaving organization within next year"
+
+# Organization size/level variables
+size_vars = ['DAGENCYSZ', 'DLEVEL', 'DSUPER']  # Common size/level variables
+
+NEEDED = list(engagement_vars) + size_vars + [turnover_var]
+
+# Likert responses parse straight to small ints ('X' = Do Not Know / No Basis to Judge);
+# size/level codes are read as text and typed by size_category()
+dtypes = {q: 'Int8' for q in engagement_vars} | {v: str for v in size_vars}
+
+
+def size_category(s):
+    """Category dtype for a size/level code column; numeric codes stay numeric so they sort 1, 2, 10."""
+    codes = pd.to_numeric(s, errors='coerce')
+    if codes.notna().equals(s.notna()) and (codes.dropna() % 1 == 0).all():
+        return codes.astype('Int64').astype('category')
+    return s.astype('category')
+
+
+def load_fevs(path):
+    """Read the NEEDED columns, using Arrow's multithreaded CSV parser when available."""
+    usecols = [c for c in pd.read_csv(path, nrows=0).columns if c in NEEDED]
+    if pa is None:
+        df = pd.read_csv(path, usecols=usecols, dtype=dtypes, na_values=['X'], engine='c')
+    else:
+        table = pacsv.read_csv(path, convert_options=pacsv.ConvertOptions(
+            include_columns=usecols,
+            # Same column types as `dtypes`: int8 answers, size/level codes as text
+            column_types={q: pa.int8() for q in engagement_vars if q in usecols} |
+                         {v: pa.string() for v in size_vars if v in usecols},
+            null_values=['', 'NA', 'X'],
+            strings_can_be_null=True,
+        ))
+        df = table.to_pandas(types_mapper={pa.int8(): pd.Int8Dtype()}.get)
+
+    # Both loaders hand size_category() the same text codes, so they return the same frame
+    for v in size_vars:
+        if v in usecols:
+            df[v] = size_category(df[v])
+    return df
+
+
+def write_csv(frame, path):
+    """Write `frame` with its index, using Arrow's C CSV writer when available."""
+    if pa is None:
+        frame.to_csv(path)
+        return
+
+    # Same columns as DataFrame.to_csv: unnamed index column first (Arrow quotes text fields)
+    table = pa.Table.from_pandas(frame.rename_axis('').reset_index(), preserve_index=False)
+    pacsv.write_csv(table, path)
+
+
 try:
     # Try to read local file first
-    df = pd.read_csv(fevs_file, low_memory=False)
+    df = load_fevs(fevs_file)
     print(f"✓ Loaded {len(df):,} responses from local file")
 except FileNotFoundError:
     print(f"\n⚠ File not found: {fevs_file}")
@@ -46,23 +128,9 @@ except FileNotFoundError:
 
 print(f"Dataset shape: {df.shape[0]:,} rows × {df.shape[1]:,} columns")
 
-# Step 2: Define engagement variables (X - low engagement indicators)
+# Step 2: Check engagement variables (X - low engagement indicators)
 print("\n[2/5] Identifying employee engagement variables (X)...")
 
-engagement_vars = {
-    'Q40': 'Opportunity to improve skills',
-    'Q12': 'Know what is expected of me',
-    'Q42': 'Supervisor supports work-life balance',
-    'Q69': 'Overall job satisfaction',
-    'Q11': 'Encouraged to come up with new ideas',
-    'Q13': 'Physical conditions allow good performance',
-    'Q14': 'Training needs are assessed',
-    'Q15': 'Satisfied with training received',
-}
-
-# Turnover intent variable (related to Y - voluntary turnover)
-turnover_var = 'DLEAVING'  # "Considering leaving organization within next year"
-
 print(f"\nEngagement variables identified:")
 for var, desc in engagement_vars.items():
     if var in df.columns:
@@ -71,45 +139,76 @@ for var, desc in engagement_vars.items():
         print(f"  ✗ {var}: Not found in dataset")
 
 # Check for organization size variable
-size_vars = ['DAGENCYSZ', 'DLEVEL', 'DSUPER']  # Common size/level variables
 available_size = [v for v in size_vars if v in df.columns]
 print(f"\nOrganization size variables available: {available_size}")
 
 # Step 3: Calculate engagement averages
 print("\n[3/5] Calculating engagement averages...")
 
-# Convert engagement questions to numeric (assuming 1-5 scale)
-for var in engagement_vars.keys():
-    if var in df.columns:
-        df[f'{var}_numeric'] = pd.to_numeric(df[var], errors='coerce')
+# Stack engagement questions into a single numeric block (1-5 scale, NaN = no response)
+qcols = [q for q in engagement_vars if q in df.columns]
+X = df[qcols].to_numpy(dtype=np.float32, na_value=np.nan)
 
 # Calculate overall engagement score (% positive responses)
 # FEVS typically codes: 1=Strongly Agree, 2=Agree, 3=Neither, 4=Disagree, 5=Strongly Disagree
 # Positive = 1 or 2 (Agree/Strongly Agree)
+# Masks are stored as column-major uint8 so each question is a contiguous
+# bincount weight. The comparisons write straight into them through a bool
+# view, so no temporary boolean matrix is allocated. NaN compares False,
+# which makes X == X the answered mask and keeps unanswered items out of pos.
+valid = np.empty(X.shape, dtype=np.uint8, order='F')
+pos = np.empty(X.shape, dtype=np.uint8, order='F')
+np.equal(X, X, out=valid.view(np.bool_))
+np.less_equal(X, 2, out=pos.view(np.bool_))
+
+n = valid.sum(axis=0, dtype=np.int64)
+pct = pos.sum(axis=0, dtype=np.int64) / n * 100
+mean = np.nansum(X, axis=0, dtype=np.float64) / n
+
+# Factorize each grouping column once and reuse the codes for every group analysis
+# (add a column here to make it available to group_engagement)
+factors = {col: pd.factorize(df[col], sort=True)
+           for col in ('DAGENCYSZ', 'DSUPER') if col in df.columns}
+
+
+def group_engagement(col):
+    """Average % positive across engagement questions for each category of `col`."""
+    codes, cats = factors[col]
+    G = len(cats)
+    # Rows with a missing category (code -1) are counted in a spare bin G and dropped,
+    # which avoids copying the masks to filter them out
+    codes = np.where(codes < 0, G, codes)
+
+    num = np.empty((G, len(qcols)))
+    den = np.empty((G, len(qcols)))
+    for j in range(len(qcols)):
+        num[:, j] = np.bincount(codes, weights=pos[:, j], minlength=G + 1)[:G]
+        den[:, j] = np.bincount(codes, weights=valid[:, j], minlength=G + 1)[:G]
+
+    # Questions nobody in a group answered are left out of that group's average;
+    # groups with no answers at all keep their count but get a NaN average
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pct_by_group = num / den * 100
+    avg_engagement = np.nanmean(pct_by_group, axis=1)
+
+    return pd.DataFrame({
+        'avg_engagement': avg_engagement,
+        'n_respondents': np.bincount(codes, minlength=G + 1)[:G]
+    }, index=cats)
 
-engagement_results = {}
-for var, desc in engagement_vars.items():
-    if var in df.columns:
-        valid_responses = df[f'{var}_numeric'].dropna()
-        if len(valid_responses) > 0:
-            # Calculate % positive (1 or 2)
-            pct_positive = ((valid_responses <= 2).sum() / len(valid_responses)) * 100
-            mean_score = valid_responses.mean()
-
-            engagement_results[var] = {
-                'description': desc,
-                'pct_positive': pct_positive,
-                'mean_score': mean_score,
-                'n_responses': len(valid_responses)
-            }
 
 # Create summary table
 print("\n" + "="*100)
 print("QUESTION 1: AVERAGE EMPLOYEE ENGAGEMENT (X VARIABLES)")
 print("="*100)
 
-summary_df = pd.DataFrame(engagement_results).T
-summary_df = summary_df.round(2)
+# Built straight from the per-question arrays; questions with no responses are dropped
+summary_df = pd.DataFrame({
+    'description': [engagement_vars[q] for q in qcols],
+    'pct_positive': pct.round(2),
+    'mean_score': mean.round(2),
+    'n_responses': n.astype(np.int64),
+}, index=qcols)[n > 0]
 summary_df = summary_df.sort_values('pct_positive', ascending=False)
 
 print("\nEngagement Metrics Summary:")
@@ -130,8 +229,11 @@ print("\n[4/5] Analyzing by organization size...")
 
 # Try to identify mid-level organizations (100-500 employees)
 if 'DAGENCYSZ' in df.columns:
+    # One grouped pass yields both the size distribution and the engagement scores
+    size_groups = group_engagement('DAGENCYSZ')
+
     print("\nOrganization size distribution:")
-    size_dist = df['DAGENCYSZ'].value_counts().sort_index()
+    size_dist = size_groups['n_respondents'].sort_index()
     print(size_dist)
 
     # Calculate engagement by size
@@ -139,26 +241,7 @@ if 'DAGENCYSZ' in df.columns:
     print("QUESTION 2: MID-LEVEL ORGANIZATIONS COMPARISON")
     print("="*100)
 
-    size_engagement = {}
-    for size_cat in df['DAGENCYSZ'].unique():
-        if pd.notna(size_cat):
-            size_subset = df[df['DAGENCYSZ'] == size_cat]
-
-            size_results = []
-            for var in engagement_vars.keys():
-                if f'{var}_numeric' in df.columns:
-                    valid = size_subset[f'{var}_numeric'].dropna()
-                    if len(valid) > 0:
-                        pct_pos = ((valid <= 2).sum() / len(valid)) * 100
-                        size_results.append(pct_pos)
-
-            if size_results:
-                size_engagement[size_cat] = {
-                    'avg_engagement': np.mean(size_results),
-                    'n_respondents': len(size_subset)
-                }
-
-    size_comparison = pd.DataFrame(size_engagement).T
+    size_comparison = size_groups.dropna(subset=['avg_engagement'])
     size_comparison = size_comparison.sort_values('avg_engagement', ascending=False)
     print("\nEngagement by Organization Size:")
     print(size_comparison.to_string())
@@ -176,26 +259,7 @@ print("="*100)
 if 'DSUPER' in df.columns:
     print("\nEngagement by Supervisory Status:")
 
-    super_engagement = {}
-    for status in df['DSUPER'].unique():
-        if pd.notna(status):
-            subset = df[df['DSUPER'] == status]
-
-            results = []
-            for var in engagement_vars.keys():
-                if f'{var}_numeric' in df.columns:
-                    valid = subset[f'{var}_numeric'].dropna()
-                    if len(valid) > 0:
-                        pct_pos = ((valid <= 2).sum() / len(valid)) * 100
-                        results.append(pct_pos)
-
-            if results:
-                super_engagement[status] = {
-                    'avg_engagement': np.mean(results),
-                    'n_respondents': len(subset)
-                }
-
-    super_df = pd.DataFrame(super_engagement).T
+    super_df = group_engagement('DSUPER').dropna(subset=['avg_engagement'])
     print(super_df.to_string())
 
 # Analyze turnover intent
@@ -212,71 +276,74 @@ if turnover_var in df.columns:
     print(f"Your organization baseline: 18% voluntary turnover")
     print(f"FEVS turnover intent: {pct_considering_leaving:.1f}%")
 
-# Create visualizations
-print("\n[6/6] Creating visualizations...")
-
-fig, axes = plt.subplots(2, 2, figsize=(16, 12))
-fig.suptitle('FEVS 2024 Employee Engagement Analysis - X, M, Y Framework',
-             fontsize=16, fontweight='bold')
-
-# Plot 1: Engagement by question (X variables)
-ax1 = axes[0, 0]
-plot_data = summary_df.sort_values('pct_positive')
-colors = ['#d62728' if x < 62 else '#2ca02c' if x > 70 else '#ff7f0e'
-          for x in plot_data['pct_positive']]
-ax1.barh(range(len(plot_data)), plot_data['pct_positive'], color=colors)
-ax1.set_yticks(range(len(plot_data)))
-ax1.set_yticklabels([engagement_vars.get(idx, idx) for idx in plot_data.index], fontsize=9)
-ax1.axvline(62, color='red', linestyle='--', label='Your baseline (62%)', linewidth=2)
-ax1.axvline(70, color='green', linestyle='--', label='Your target (70%)', linewidth=2)
-ax1.set_xlabel('% Positive Responses', fontsize=11)
-ax1.set_title('Q1: Employee Engagement by Question (X Variables)', fontsize=12, fontweight='bold')
-ax1.legend()
-ax1.grid(axis='x', alpha=0.3)
-
-# Plot 2: Organization size comparison (if available)
-ax2 = axes[0, 1]
-if 'DAGENCYSZ' in df.columns and len(size_comparison) > 0:
-    size_comparison_sorted = size_comparison.sort_values('avg_engagement')
-    ax2.barh(range(len(size_comparison_sorted)),
-             size_comparison_sorted['avg_engagement'],
-             color='steelblue')
-    ax2.set_yticks(range(len(size_comparison_sorted)))
-    ax2.set_yticklabels(size_comparison_sorted.index, fontsize=9)
-    ax2.axvline(62, color='red', linestyle='--', label='Your baseline', linewidth=2)
-    ax2.set_xlabel('Average Engagement %', fontsize=11)
-    ax2.set_title('Q2: Engagement by Organization Size', fontsize=12, fontweight='bold')
-    ax2.legend()
-    ax2.grid(axis='x', alpha=0.3)
+# Create visualizations (skipped with --no-plot)
+if no_plot:
+    print("\n[6/6] Skipping visualizations (--no-plot)")
 else:
-    ax2.text(0.5, 0.5, 'Organization size data\nnot available',
-             ha='center', va='center', fontsize=12)
-    ax2.set_title('Q2: Organization Size Comparison', fontsize=12, fontweight='bold')
-
-# Plot 3: Supervisory status patterns
-ax3 = axes[1, 0]
-if 'DSUPER' in df.columns and len(super_df) > 0:
-    super_sorted = super_df.sort_values('avg_engagement')
-    ax3.barh(range(len(super_sorted)),
-             super_sorted['avg_engagement'],
-             color='darkorange')
-    ax3.set_yticks(range(len(super_sorted)))
-    ax3.set_yticklabels(super_sorted.index, fontsize=9)
-    ax3.axvline(62, color='red', linestyle='--', label='Your baseline', linewidth=2)
-    ax3.set_xlabel('Average Engagement %', fontsize=11)
-    ax3.set_title('Q3: Patterns by Supervisory Status', fontsize=12, fontweight='bold')
-    ax3.legend()
-    ax3.grid(axis='x', alpha=0.3)
-else:
-    ax3.text(0.5, 0.5, 'Supervisory status data\nnot available',
-             ha='center', va='center', fontsize=12)
-    ax3.set_title('Q3: Supervisory Status Patterns', fontsize=12, fontweight='bold')
+    print("\n[6/6] Creating visualizations...")
+
+    fig, axes = plt.subplots(2, 2, figsize=(16, 12))
+    fig.suptitle('FEVS 2024 Employee Engagement Analysis - X, M, Y Framework',
+                 fontsize=16, fontweight='bold')
+
+    # Plot 1: Engagement by question (X variables)
+    ax1 = axes[0, 0]
+    plot_data = summary_df.sort_values('pct_positive')
+    colors = ['#d62728' if x < 62 else '#2ca02c' if x > 70 else '#ff7f0e'
+              for x in plot_data['pct_positive']]
+    ax1.barh(range(len(plot_data)), plot_data['pct_positive'], color=colors, rasterized=True)
+    ax1.set_yticks(range(len(plot_data)))
+    ax1.set_yticklabels([engagement_vars.get(idx, idx) for idx in plot_data.index], fontsize=9)
+    ax1.axvline(62, color='red', linestyle='--', label='Your baseline (62%)', linewidth=2)
+    ax1.axvline(70, color='green', linestyle='--', label='Your target (70%)', linewidth=2)
+    ax1.set_xlabel('% Positive Responses', fontsize=11)
+    ax1.set_title('Q1: Employee Engagement by Question (X Variables)', fontsize=12, fontweight='bold')
+    ax1.legend()
+    ax1.grid(axis='x', alpha=0.3)
+
+    # Plot 2: Organization size comparison (if available)
+    ax2 = axes[0, 1]
+    if 'DAGENCYSZ' in df.columns and len(size_comparison) > 0:
+        size_comparison_sorted = size_comparison.sort_values('avg_engagement')
+        ax2.barh(range(len(size_comparison_sorted)),
+                 size_comparison_sorted['avg_engagement'],
+                 color='steelblue', rasterized=True)
+        ax2.set_yticks(range(len(size_comparison_sorted)))
+        ax2.set_yticklabels(size_comparison_sorted.index, fontsize=9)
+        ax2.axvline(62, color='red', linestyle='--', label='Your baseline', linewidth=2)
+        ax2.set_xlabel('Average Engagement %', fontsize=11)
+        ax2.set_title('Q2: Engagement by Organization Size', fontsize=12, fontweight='bold')
+        ax2.legend()
+        ax2.grid(axis='x', alpha=0.3)
+    else:
+        ax2.text(0.5, 0.5, 'Organization size data\nnot available',
+                 ha='center', va='center', fontsize=12)
+        ax2.set_title('Q2: Organization Size Comparison', fontsize=12, fontweight='bold')
+
+    # Plot 3: Supervisory status patterns
+    ax3 = axes[1, 0]
+    if 'DSUPER' in df.columns and len(super_df) > 0:
+        super_sorted = super_df.sort_values('avg_engagement')
+        ax3.barh(range(len(super_sorted)),
+                 super_sorted['avg_engagement'],
+                 color='darkorange', rasterized=True)
+        ax3.set_yticks(range(len(super_sorted)))
+        ax3.set_yticklabels(super_sorted.index, fontsize=9)
+        ax3.axvline(62, color='red', linestyle='--', label='Your baseline', linewidth=2)
+        ax3.set_xlabel('Average Engagement %', fontsize=11)
+        ax3.set_title('Q3: Patterns by Supervisory Status', fontsize=12, fontweight='bold')
+        ax3.legend()
+        ax3.grid(axis='x', alpha=0.3)
+    else:
+        ax3.text(0.5, 0.5, 'Supervisory status data\nnot available',
+                 ha='center', va='center', fontsize=12)
+        ax3.set_title('Q3: Supervisory Status Patterns', fontsize=12, fontweight='bold')
 
-# Plot 4: Summary scorecard
-ax4 = axes[1, 1]
-ax4.axis('off')
+    # Plot 4: Summary scorecard
+    ax4 = axes[1, 1]
+    ax4.axis('off')
 
-scorecard_text = f"""
+    scorecard_text = f"""
 SUMMARY SCORECARD
 
 Your Organization (Baseline):
@@ -305,35 +372,43 @@ Key Findings:
      • {summary_df.index[-2]}
 """
 
-ax4.text(0.05, 0.95, scorecard_text,
-         transform=ax4.transAxes,
-         fontsize=10,
-         verticalalignment='top',
-         fontfamily='monospace',
-         bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.3))
+    ax4.text(0.05, 0.95, scorecard_text,
+             transform=ax4.transAxes,
+             fontsize=10,
+             verticalalignment='top',
+             fontfamily='monospace',
+             bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.3))
 
-plt.tight_layout()
-plt.savefig('fevs_analysis_summary.png', dpi=300, bbox_inches='tight')
-print("\n✓ Visualization saved as 'fevs_analysis_summary.png'")
+    plt.tight_layout()
+    plt.savefig('fevs_analysis_summary.png', dpi=120, bbox_inches='tight')
+    print("\n✓ Visualization saved as 'fevs_analysis_summary.png'")
+    if not show_plots:
+        plt.close(fig)  # Free the figure's buffers before the CSV exports
 
 # Export summary tables to CSV
-summary_df.to_csv('fevs_engagement_summary.csv')
+write_csv(summary_df, 'fevs_engagement_summary.csv')
 print("✓ Summary table exported to 'fevs_engagement_summary.csv'")
 
 if 'DAGENCYSZ' in df.columns and len(size_comparison) > 0:
-    size_comparison.to_csv('fevs_size_comparison.csv')
+    write_csv(size_comparison, 'fevs_size_comparison.csv')
     print("✓ Size comparison exported to 'fevs_size_comparison.csv'")
 
 print("\n" + "="*80)
 print("ANALYSIS COMPLETE")
 print("="*80)
 print("\nFiles created:")
-print("  1. fevs_analysis_summary.png - Comprehensive visualization")
-print("  2. fevs_engagement_summary.csv - Detailed engagement metrics")
-print("  3. fevs_size_comparison.csv - Organization size benchmarks (if available)")
+files_created = [
+    "fevs_engagement_summary.csv - Detailed engagement metrics",
+    "fevs_size_comparison.csv - Organization size benchmarks (if available)",
+]
+if not no_plot:
+    files_created.insert(0, "fevs_analysis_summary.png - Comprehensive visualization")
+for i, entry in enumerate(files_created, 1):
+    print(f"  {i}. {entry}")
 print("\nNext steps:")
 print("  1. Review the visualization to identify improvement priorities")
 print("  2. Use the CSV files for detailed analysis and reporting")
 print("  3. Map these findings to your X → M → Y framework")
 
-plt.show()
+if show_plots and not no_plot:
+    plt.show()